@@ -1,26 +1,31 @@
 """Lightweight RAG evaluation script for manual answer grounding assessment.
 
-Run with: python -m scripts.eval_rag_roundtrip
+Run with: python -m scripts.eval_rag_roundtrip [--use-cache]
 
 For each test case, this script:
 1. Retrieves context from the FAQ using simple_faq_rag.
 2. Builds the augmented_user_message with instructions (same as io_loop.py).
-3. Calls generate_with_ollama to get an answer.
+3. Calls generate_with_ollama_async to get an answer.
 4. Prints formatted output for manual review.
+
+Test cases run concurrently and are printed in completion order. Every
+case calls the LLM so prompt/model changes show up; pass `--use-cache` to
+reuse answers from the semantic response cache instead.
 """
 
-from src.rag.simple_faq_rag import get_rag_context
-from src.dialogue.ollama_client import generate_with_ollama
+import asyncio
+import contextlib
+import sys
+from io import StringIO
+from itertools import islice
+from typing import Optional
 
+import httpx
 
-# System prompt (same as in io_loop.py)
-SYSTEM_PROMPT = """
-You are a telecom customer support coach.
-You talk to a human agent (not the customer) and tell them what to say.
-Always follow the Docs context from support_faq.md over any other knowledge.
-When answering, give 3–6 concise bullet points the agent can read out.
-If the Docs context does not cover the issue, say that clearly and suggest the agent escalate or check with a supervisor.
-""".strip()
+from src.rag.simple_faq_rag import get_rag_context, get_rag_context_batch
+from src.dialogue.ollama_client import generate_with_ollama_async
+from src.dialogue import semantic_cache
+from src.dialogue.prompts import SYSTEM_PROMPT, build_augmented_message
 
 
 TEST_CASES = [
@@ -57,56 +62,89 @@ TEST_CASES = [
 ]
 
 
-def run_test_case(test_case: dict) -> None:
-    """Run a single RAG evaluation test case and print formatted output."""
+async def run_test_case(
+    test_case: dict,
+    context: Optional[str] = None,
+    client: Optional[httpx.AsyncClient] = None,
+    sem: Optional[asyncio.Semaphore] = None,
+    use_cache: bool = False,
+) -> None:
+    """Run a single RAG evaluation test case and print formatted output.
+
+    `context` is the prefetched RAG context; it is retrieved here if omitted.
+    `client` and `sem` let concurrent test cases share one connection pool
+    and a bound on in-flight LLM requests. With `use_cache` the answer may
+    come from (and is stored in) the semantic response cache.
+    """
     test_id = test_case["id"]
     question = test_case["question"]
     expected = test_case["expected"]
 
-    # Retrieve RAG context
-    context = get_rag_context(question, k=3)
+    if context is None:
+        context = get_rag_context(question, k=3)
 
     # Build augmented message (same as io_loop.py)
-    augmented_user_message = f"""
-Docs context:
-
-{context}
+    augmented_user_message = build_augmented_message(context, question)
+
+    # Call the LLM with empty history (isolated test); only consult the
+    # cache when explicitly asked to
+    answer = None
+    if use_cache:
+        answer = await asyncio.to_thread(semantic_cache.lookup, question, context)
+    if answer is None:
+        async with sem or contextlib.nullcontext():
+            answer = await generate_with_ollama_async(
+                system_prompt=SYSTEM_PROMPT,
+                history=[],
+                user_message=augmented_user_message,
+                client=client,
+            )
+        if use_cache:
+            await asyncio.to_thread(semantic_cache.store, question, context, answer)
+
+    # Print the whole block with one write so concurrent cases can't interleave
+    block = [
+        "=" * 80,
+        f"TEST ID: {test_id}",
+        f"QUESTION: {question}",
+        f"EXPECTED: {expected}",
+        "",
+        "CONTEXT PREVIEW:",
+        # Read only the first 8 lines instead of splitting the whole context
+        *(line.rstrip("\n") for line in islice(StringIO(context), 8)),
+        "",
+        "MODEL ANSWER:",
+        answer,
+        "=" * 80,
+        "",
+    ]
+    sys.stdout.write("\n".join(block) + "\n")
+
+
+async def run_all(max_concurrency: int = 8, use_cache: bool = False) -> None:
+    """Run every test case concurrently, printing each as it completes."""
+    # Retrieve all contexts up front, embedding every question in one batch
+    contexts = get_rag_context_batch([tc["question"] for tc in TEST_CASES], k=3)
+    ctx_map = {tc["id"]: ctx for tc, ctx in zip(TEST_CASES, contexts)}
+    sem = asyncio.Semaphore(max_concurrency)
+    async with httpx.AsyncClient(timeout=120) as client:
+        await asyncio.gather(
+            *(run_test_case(tc, ctx_map[tc["id"]], client, sem, use_cache) for tc in TEST_CASES)
+        )
 
-Instructions:
-- Answer ONLY using the Docs context above.
-- If the Docs context is missing information, say that explicitly
-  and suggest the agent escalate or check with a supervisor.
 
-Customer question:
-{question}
-""".strip()
+if __name__ == "__main__":
+    import argparse
 
-    # Call LLM with empty history (isolated test)
-    answer = generate_with_ollama(
-        system_prompt=SYSTEM_PROMPT,
-        history=[],
-        user_message=augmented_user_message,
+    parser = argparse.ArgumentParser(description="RAG evaluation roundtrip")
+    parser.add_argument(
+        "--use-cache",
+        action="store_true",
+        help="Reuse answers from the semantic response cache (off by default)",
     )
+    args = parser.parse_args()
 
-    # Print formatted output
-    print("=" * 80)
-    print(f"TEST ID: {test_id}")
-    print(f"QUESTION: {question}")
-    print(f"EXPECTED: {expected}")
-    print()
-    print("CONTEXT PREVIEW:")
-    for line in context.splitlines()[:8]:
-        print(line)
-    print()
-    print("MODEL ANSWER:")
-    print(answer)
-    print("=" * 80)
-    print()
-
-
-if __name__ == "__main__":
     print("RAG Evaluation Roundtrip")
     print("Running all test cases...\n")
-    for tc in TEST_CASES:
-        run_test_case(tc)
+    asyncio.run(run_all(use_cache=args.use_cache))
     print("Done.")
@@ -1,24 +1,24 @@
-"""ASR (automatic speech recognition) wrapper skeleton.
+"""ASR (automatic speech recognition) entry point.
 
-This module provides a minimal, importable stub for transcription so the
-rest of the project can call into `transcribe_chunk` without requiring
-heavy ASR dependencies during development.
+The public API is a single function `transcribe_chunk(wav_bytes, language)`
+which accepts WAV bytes and returns a string transcription.
 
-Later this will be replaced with a real integration (e.g. Whisper local
-model, cloud ASR API, or another on-device model). The public API is a
-single function `transcribe_chunk(wav_bytes, language)` which accepts raw
-WAV bytes and returns a string transcription.
-
-The implementation below intentionally returns a fixed placeholder string.
+The backend is resolved lazily, on the first call: when the Whisper wrapper
+in `src.audio.asr_whisper` (and its `openai` dependency) can be imported,
+calls go to `asr_whisper.transcribe_file`; otherwise to a dependency-free
+placeholder that returns a fixed string. Importing this module therefore
+never pulls in openai/httpx/pydantic, and a broken install of those falls
+back to the placeholder instead of failing the import. `asr_backend()`
+reports which backend is in use ("whisper" or "placeholder").
 """
 
 from __future__ import annotations
 
-from typing import Optional
+from typing import Callable, Optional
 
 
-def transcribe_chunk(wav_bytes: bytes, language: Optional[str] = "en") -> str:
-    """Transcribe a single chunk of audio.
+def _placeholder_transcribe(wav_bytes: bytes, language: Optional[str] = None) -> str:
+    """Transcribe a single chunk of audio (placeholder backend).
 
     Args:
         wav_bytes: Audio bytes containing a WAV-encoded or raw PCM chunk.
@@ -28,18 +28,40 @@ def transcribe_chunk(wav_bytes: bytes, language: Optional[str] = "en") -> str:
             use this to choose models or decoding options.
 
     Returns:
-        A transcription string. Currently this is a placeholder value:
-        "[ASR transcription placeholder]".
-
-    Notes:
-        - This function is intentionally dependency-free and safe to import
-          in lightweight environments. Replace the body with a real ASR
-          call when ready (for example, a Whisper wrapper, an HTTP API,
-          or an on-device model invocation).
+        A transcription string. This backend always returns the
+        placeholder value "[ASR transcription placeholder]".
     """
     # Placeholder implementation: return a fixed string so callers can
     # rely on a consistent return type during development and testing.
     return "[ASR transcription placeholder]"
 
 
-__all__ = ["transcribe_chunk"]
+_backend: Optional[Callable[..., str]] = None
+_backend_name = ""
+
+
+def _resolve_backend() -> Callable[..., str]:
+    """Pick the ASR backend on first use and remember it."""
+    global _backend, _backend_name
+    if _backend is None:
+        try:
+            from src.audio.asr_whisper import transcribe_file
+        except Exception:
+            _backend, _backend_name = _placeholder_transcribe, "placeholder"
+        else:
+            _backend, _backend_name = transcribe_file, "whisper"
+    return _backend
+
+
+def asr_backend() -> str:
+    """Return the name of the ASR backend in use ("whisper" or "placeholder")."""
+    _resolve_backend()
+    return _backend_name
+
+
+def transcribe_chunk(wav_bytes: bytes, language: Optional[str] = None) -> str:
+    """Transcribe WAV bytes with the resolved backend (see module docstring)."""
+    return _resolve_backend()(wav_bytes, language)
+
+
+__all__ = ["transcribe_chunk", "asr_backend"]
@@ -2,7 +2,7 @@
 
 This module provides a simple wrapper around the OpenAI Whisper
 transcription API. It is intentionally small: callers provide a file
-path and receive back the transcribed text.
+path or in-memory WAV bytes and receive back the transcribed text.
 
 Note: The OpenAI Python client must be installed and configured with
 credentials in the environment for this to work (OPENAI_API_KEY or
@@ -12,28 +12,60 @@ on network/auth problems; callers should handle them as needed.
 
 from __future__ import annotations
 
-from typing import Any
+import io
+from typing import Any, Optional, Union
 
-from openai import OpenAI
+import httpx
+from openai import DefaultHttpxClient, OpenAI
 
+# Created on first use and reused so repeated transcriptions share one
+# connection pool instead of paying client setup + TLS per call.
+# DefaultHttpxClient keeps the SDK's own timeout/redirect defaults.
+_client: Optional[OpenAI] = None
 
-def transcribe_file(path: str) -> str:
-    """Transcribe an audio file using OpenAI Whisper.
+
+def _get_client() -> OpenAI:
+    global _client
+    if _client is None:
+        _client = OpenAI(
+            http_client=DefaultHttpxClient(limits=httpx.Limits(max_keepalive_connections=10))
+        )
+    return _client
+
+
+def transcribe_file(audio: Union[str, bytes], language: Optional[str] = None) -> str:
+    """Transcribe audio using OpenAI Whisper.
 
     Args:
-        path: Path to a local audio file (WAV, MP3, etc.).
+        audio: Path to a local audio file (WAV, MP3, etc.), or WAV-encoded
+            bytes already in memory (no temporary file is written).
+        language: Optional ISO-639-1 hint (e.g. "en"); Whisper auto-detects
+            the language when omitted.
 
     Returns:
         The transcription as a plain string.
     """
-    client = OpenAI()
+    client = _get_client()
+    options = {"language": language} if language else {}
 
-    with open(path, "rb") as audio_file:
+    if isinstance(audio, (bytes, bytearray)):
+        audio_file = io.BytesIO(audio)
+        # The SDK infers the format from the file name
+        audio_file.name = "audio.wav"
         resp: Any = client.audio.transcriptions.create(
             model="whisper-1",
             file=audio_file,
             response_format="text",
+            **options,
         )
+    else:
+        with open(audio, "rb") as audio_file:
+            resp = client.audio.transcriptions.create(
+                model="whisper-1",
+                file=audio_file,
+                response_format="text",
+                **options,
+            )
 
     # The SDK may return a simple string or an object containing the text.
     # Prefer common fields, fall back to string conversion.
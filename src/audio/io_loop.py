@@ -12,18 +12,30 @@ plugged in later.
 
 from __future__ import annotations
 
+import asyncio
+import logging
+import os
+import re
+import sys
 import uuid
-from typing import Optional
+from concurrent.futures import Future, ThreadPoolExecutor
+from io import StringIO
+from itertools import islice
+from typing import Iterable, Iterator, Optional
+
+import httpx
 
 from src.dialogue.state import Session, SpeakerRole
-from src.dialogue.ollama_client import generate_with_ollama
+from src.dialogue.ollama_client import generate_with_ollama_async, stream_with_ollama
+from src.dialogue import semantic_cache
+from src.dialogue.prompts import SYSTEM_PROMPT, build_augmented_message
 from src.rag.simple_faq_rag import get_rag_context
-from src.audio.asr import transcribe_chunk
+from src.audio.asr import asr_backend, transcribe_chunk
 from src.audio.tts import speak
 
 
-# Debug flag: set to True to log RAG context retrieval during development
-DEBUG_RAG = True
+# RAG context retrieval is logged at DEBUG level (run with LOG_LEVEL=DEBUG)
+logger = logging.getLogger("audio.io_loop")
 
 # Example ASR inputs to test RAG and cover all FAQ sections:
 # - I want to change my mobile plan, what should I say?
@@ -38,6 +50,111 @@ PROMPT_SIMULATED_ASR = "ASR text (or /quit): "
 PROMPT_HUMAN = "HUMAN_AGENT> "
 
 
+def _rag_debug_lines(question: str, context: str) -> list[str]:
+    """Return the RAG debug block (question + first 8 context lines) as lines.
+
+    Callers log the block as one record instead of one line at a time.
+    """
+    return [
+        "=== RAG DEBUG ===",
+        f"QUESTION: {question}",
+        "CONTEXT PREVIEW:",
+        *(line.rstrip("\n") for line in islice(StringIO(context), 8)),
+        "=================",
+    ]
+
+
+# A sentence is complete once terminal punctuation is followed by whitespace
+_SENTENCE_END = re.compile(r'[.!?]\s')
+# Matches only the first sentence of a reply (used to trim replies), so the
+# scan stops at the first terminal punctuation instead of walking the whole reply
+_FIRST_SENT = re.compile(r'(.+?[.!?])(?=\s|$)', re.S)
+
+
+def _stream_cached(
+    history: list[dict],
+    question: str,
+    rag_context: str,
+    user_message: str,
+    use_cache: bool = True,
+) -> Iterator[str]:
+    """Yield reply tokens from the semantic cache or a streaming Ollama call.
+
+    A cache hit yields the whole cached reply at once. Fresh replies are
+    always stored; `use_cache=False` only skips the lookup.
+    """
+    if use_cache:
+        cached = semantic_cache.lookup(question, rag_context, history)
+        if cached is not None:
+            yield cached
+            return
+
+    parts: list[str] = []
+    for token in stream_with_ollama(
+        system_prompt=SYSTEM_PROMPT,
+        history=history,
+        user_message=user_message,
+    ):
+        parts.append(token)
+        yield token
+    semantic_cache.store(question, rag_context, "".join(parts), history)
+
+
+def _speak_streamed(
+    tokens: Iterable[str],
+    max_sentences: Optional[int] = None,
+    echo_prefix: Optional[str] = None,
+) -> str:
+    """Send complete sentences to `speak()` while tokens are still arriving.
+
+    Sentences go to a single background worker, so TTS overlaps with LLM
+    decoding but playback order is preserved. Only the first
+    `max_sentences` sentences are spoken (all if None); the stream is still
+    consumed to the end and the full reply text is returned.
+
+    With `echo_prefix` (e.g. "BOT> "), each sentence is also printed on its
+    own line as it is handed to TTS, so the text shows up before playback
+    finishes rather than after.
+
+    An exception raised by `speak()` is re-raised once playback has
+    finished (the first one, in sentence order).
+    """
+    parts: list[str] = []
+    pending = ""
+    remaining = max_sentences if max_sentences is not None else float("inf")
+    spoken: list[Future] = []
+
+    def _flush(sentence: str) -> None:
+        if echo_prefix is not None:
+            # One write per line so TTS worker output can't split it
+            sys.stdout.write(f"{echo_prefix}{sentence}\n")
+            sys.stdout.flush()
+        spoken.append(tts.submit(speak, sentence))
+
+    with ThreadPoolExecutor(max_workers=1) as tts:
+        for token in tokens:
+            parts.append(token)
+            if remaining <= 0:
+                continue
+            pending += token
+            m = _SENTENCE_END.search(pending)
+            while m and remaining > 0:
+                _flush(pending[: m.end()].strip())
+                pending = pending[m.end() :]
+                remaining -= 1
+                m = _SENTENCE_END.search(pending)
+
+        # Flush a trailing sentence that had no whitespace after it
+        if pending.strip() and remaining > 0:
+            _flush(pending.strip())
+
+    # Surface the first TTS failure to the caller, as a direct speak() would
+    for future in spoken:
+        future.result()
+
+    return "".join(parts)
+
+
 def demo_turn_based_audio_session() -> None:
     """Run a simple turn-based audio session demo.
 
@@ -57,14 +174,6 @@ def demo_turn_based_audio_session() -> None:
     print(f"Starting simulated audio session {session.session_id} (active_role={session.active_role.name})")
     print("Type simulated ASR transcriptions (or /quit to exit).")
 
-    system_prompt = """
-    You are a telecom customer support coach.
-    You talk to a human agent (not the customer) and tell them what to say.
-    Always follow the Docs context from support_faq.md over any other knowledge.
-    When answering, give 3–6 concise bullet points the agent can read out.
-    If the Docs context does not cover the issue, say that clearly and suggest the agent escalate or check with a supervisor.
-    """.strip()
-
     try:
         while True:
             try:
@@ -84,55 +193,37 @@ def demo_turn_based_audio_session() -> None:
             # The user is typing a simulated ASR transcription. In a real
             # implementation we would call `transcribe_chunk` with audio
             # bytes; here the developer directly supplies the transcription.
-            customer_text = raw
+            customer_text, use_cache = semantic_cache.split_nocache_flag(raw)
+            if not customer_text:
+                continue
 
             # Show the ASR output for clarity, then record the customer turn
             print(f"Customer (ASR)> {customer_text}")
             session.add_turn(SpeakerRole.CUSTOMER, customer_text)
 
             if session.active_role == SpeakerRole.BOT:
-                # Build history from session turns
-                history: list[dict] = []
-                for turn in session.turns:
-                    if turn.speaker == SpeakerRole.CUSTOMER:
-                        history.append({"role": "user", "content": turn.text})
-                    else:
-                        history.append({"role": "assistant", "content": turn.text})
+                history = session.as_llm_history()
 
                 # Retrieve short RAG context from the FAQ and include it
                 rag_context = get_rag_context(customer_text)
                 
-                if DEBUG_RAG:
-                    print("=== RAG DEBUG ===")
-                    print("QUESTION:", customer_text)
-                    print("CONTEXT PREVIEW:")
-                    for line in rag_context.splitlines()[:8]:
-                        print(line)
-                    print("=================")
-                
-                augmented_message = f"""
-                Docs context:
-
-                {rag_context}
-
-                Instructions:
-                - Answer ONLY using the Docs context above.
-                - If the Docs context is missing information, say that explicitly
-                  and suggest the agent escalate or check with a supervisor.
-
-                Customer question:
-                {customer_text}
-                """.strip()
-
-                reply_text = generate_with_ollama(
-                    system_prompt=system_prompt,
-                    history=history,
-                    user_message=augmented_message,
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("\n".join(_rag_debug_lines(customer_text, rag_context)))
+
+                augmented_message = build_augmented_message(rag_context, customer_text)
+
+                # Print and speak the reply sentence by sentence as it
+                # streams in, then log it
+                reply_text = _speak_streamed(
+                    _stream_cached(
+                        history,
+                        customer_text,
+                        rag_context,
+                        augmented_message,
+                        use_cache=use_cache,
+                    ),
+                    echo_prefix="BOT> ",
                 )
-
-                # Print the bot reply, then send it to the TTS stub and log it
-                print(f"BOT> {reply_text}")
-                speak(reply_text)
                 session.add_turn(SpeakerRole.BOT, reply_text)
 
             elif session.active_role == SpeakerRole.HUMAN_AGENT:
@@ -159,6 +250,11 @@ def demo_turn_based_audio_session() -> None:
         print("\nKeyboard interrupt — exiting demo.")
 
 
+def _write_bytes(path: str, data: bytes) -> None:
+    with open(path, "wb") as f:
+        f.write(data)
+
+
 def run_full_voice_test(duration: float = 4.0, sample_rate: int = 16000) -> None:
     """Record a short clip, run ASR -> LLM -> TTS, then exit.
 
@@ -170,12 +266,12 @@ def run_full_voice_test(duration: float = 4.0, sample_rate: int = 16000) -> None
 
     try:
         import io
-        import wave
-        import sounddevice as sd
-        import numpy as np
+        import sounddevice  # checked here so a missing install gets the hint below
+        import soundfile as sf
+        from src.audio.pcm import record_pcm16
     except Exception as exc:
-        print("Error: full voice test requires 'sounddevice' and 'numpy'.")
-        print("Install with: pip install sounddevice numpy")
+        print("Error: full voice test requires 'sounddevice', 'numpy' and 'soundfile'.")
+        print("Install with: pip install sounddevice numpy soundfile")
         print(f"Detail: {exc}")
         return
 
@@ -183,115 +279,70 @@ def run_full_voice_test(duration: float = 4.0, sample_rate: int = 16000) -> None
 
     try:
         print("Recording...")
-        recording = sd.rec(int(duration * sample_rate), samplerate=sample_rate, channels=channels, dtype='float32')
-        sd.wait()
+        # Captured directly as int16 PCM, so no float conversion is needed
+        int_data = record_pcm16(duration, sample_rate, channels)
         print("Done.")
         print("STEP 1: recorded audio")
 
-        # Normalize and convert to int16 PCM
-        audio = np.asarray(recording)
-        if audio.ndim > 1:
-            audio = audio.reshape(-1, channels)
-        audio = np.clip(audio, -1.0, 1.0)
-        int_data = (audio * 32767.0).astype(np.int16)
-
-        # Write WAV to in-memory bytes buffer
+        # Write WAV to in-memory bytes buffer (libsndfile does the encoding)
         buf = io.BytesIO()
-        with wave.open(buf, 'wb') as wf:
-            wf.setnchannels(channels)
-            wf.setsampwidth(2)
-            wf.setframerate(sample_rate)
-            wf.writeframes(int_data.tobytes())
+        sf.write(buf, int_data, sample_rate, format='WAV', subtype='PCM_16')
 
         wav_bytes = buf.getvalue()
 
-        # Save WAV to disk for inspection
-        try:
-            import os
+        # Save WAV to disk for inspection on a background thread; ASR reads
+        # the in-memory bytes, so the upload doesn't wait on the disk write
+        out_path = os.path.abspath("full_voice_test.wav")
+        with ThreadPoolExecutor(max_workers=1) as disk:
+            saved = disk.submit(_write_bytes, out_path, wav_bytes)
+
+            print("STEP 2: sending audio to ASR...")
+            if asr_backend() != "whisper":
+                print("Error: Whisper ASR unavailable. Install with: pip install openai")
+                return
+            try:
+                asr_text = transcribe_chunk(wav_bytes)
+            except Exception as exc:
+                print("Error: Whisper ASR failed:", exc)
+                return
 
-            out_path = os.path.abspath("full_voice_test.wav")
-            with open(out_path, "wb") as outf:
-                outf.write(wav_bytes)
+        # non-fatal: continue even if saving failed
+        if saved.exception() is None:
             print(f"Saved WAV to {out_path}")
-        except Exception:
-            # non-fatal: continue even if saving fails
-            pass
-
-        # Call ASR (use Whisper on the saved WAV file)
-        print("STEP 2: sending audio to ASR...")
-        try:
-            from src.audio.asr_whisper import transcribe_file
-
-            asr_text = transcribe_file(out_path)
-        except Exception as exc:
-            print("Error: Whisper ASR failed:", exc)
-            return
 
         print(f"STEP 3: ASR text: {asr_text}")
 
         # Build session and history, then call LLM
         session = Session(session_id=str(uuid.uuid4()))
-        system_prompt = """
-        You are a telecom customer support coach.
-        You talk to a human agent (not the customer) and tell them what to say.
-        Always follow the Docs context from support_faq.md over any other knowledge.
-        When answering, give 3–6 concise bullet points the agent can read out.
-        If the Docs context does not cover the issue, say that clearly and suggest the agent escalate or check with a supervisor.
-        """.strip()
-
         session.add_turn(SpeakerRole.CUSTOMER, asr_text)
 
-        history: list[dict] = []
-        for turn in session.turns:
-            if turn.speaker == SpeakerRole.CUSTOMER:
-                history.append({"role": "user", "content": turn.text})
-            else:
-                history.append({"role": "assistant", "content": turn.text})
+        history = session.as_llm_history()
 
         print("STEP 4: sending text to LLM...")
         # Add RAG context to the LLM input
         rag_context = get_rag_context(asr_text)
         
-        if DEBUG_RAG:
-            print("=== RAG DEBUG ===")
-            print("QUESTION:", asr_text)
-            print("CONTEXT PREVIEW:")
-            for line in rag_context.splitlines()[:8]:
-                print(line)
-            print("=================")
-        
-        augmented_message = f"""
-        Docs context:
-
-        {rag_context}
-
-        Instructions:
-        - Answer ONLY using the Docs context above.
-        - If the Docs context is missing information, say that explicitly
-          and suggest the agent escalate or check with a supervisor.
-
-        Customer question:
-        {asr_text}
-        """.strip()
-
-        reply_text = generate_with_ollama(
-            system_prompt=system_prompt,
-            history=history,
-            user_message=augmented_message,
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("\n".join(_rag_debug_lines(asr_text, rag_context)))
+
+        augmented_message = build_augmented_message(rag_context, asr_text)
+
+        # Only the first sentence is spoken; it goes to TTS as soon as it
+        # has been decoded instead of after the full reply.
+        print("STEP 5: streaming first sentence of reply to TTS...")
+        reply_text = _speak_streamed(
+            _stream_cached(history, asr_text, rag_context, augmented_message),
+            max_sentences=1,
+            echo_prefix="BOT> ",
         )
 
-        # Trim to first sentence before speaking
-        import re
-
+        # Trim to the first sentence that was spoken
         reply_text = reply_text.strip()
-        parts = re.split(r'(?<=[.!?])\s+', reply_text)
-        if parts:
-            reply_text = parts[0]
-
-        print(f"STEP 5: BOT reply (trimmed): {reply_text}")
-        print("STEP 6: sending reply to TTS...")
-        print(f"BOT> {reply_text}")
-        speak(reply_text)
+        m = _FIRST_SENT.match(reply_text)
+        if m:
+            reply_text = m.group(1)
+
+        print(f"STEP 6: BOT reply (trimmed): {reply_text}")
         session.add_turn(SpeakerRole.BOT, reply_text)
 
     except Exception as exc:
@@ -299,104 +350,118 @@ def run_full_voice_test(duration: float = 4.0, sample_rate: int = 16000) -> None
         print(exc)
 
 
-def load_test_scenarios(path: str = "scenarios.txt") -> list[str]:
-    """Read a scenarios file and return non-empty lines.
+def iter_scenarios(path: str = "scenarios.txt") -> Iterator[str]:
+    """Yield the non-empty, stripped lines of a scenarios file as they are read.
 
-    Each non-empty line in `path` is treated as one test scenario.
+    Each non-empty line in `path` is treated as one test scenario. Read
+    errors are reported and end the iteration.
     """
-    scenarios: list[str] = []
     try:
         with open(path, "r", encoding="utf-8") as f:
             for line in f:
                 s = line.strip()
                 if s:
-                    scenarios.append(s)
+                    yield s
     except FileNotFoundError:
         print(f"Scenarios file not found: {path}")
     except Exception as exc:
         print(f"Error reading scenarios file {path}: {exc}")
 
-    return scenarios
+
+def load_test_scenarios(path: str = "scenarios.txt") -> list[str]:
+    """Read a scenarios file and return non-empty lines.
+
+    Each non-empty line in `path` is treated as one test scenario.
+    """
+    return list(iter_scenarios(path))
 
 
-def run_scenario_tests(path: str = "scenarios.txt") -> None:
+def run_scenario_tests(
+    path: str = "scenarios.txt",
+    max_concurrency: int = 8,
+    use_cache: bool = False,
+) -> None:
     """Run through scenarios from a file and print LLM replies (no TTS).
 
     For each scenario we create an isolated Session, send the scenario
     text to the LLM using the same system rules as the voice pipeline,
     trim the reply to the first sentence, and print it. TTS is not called.
-    """
-    scenarios = load_test_scenarios(path)
-    if not scenarios:
-        print("No scenarios to run.")
-        return
-
-    system_prompt = """
-    You are a telecom customer support coach.
-    You talk to a human agent (not the customer) and tell them what to say.
-    Always follow the Docs context from support_faq.md over any other knowledge.
-    When answering, give 3–6 concise bullet points the agent can read out.
-    If the Docs context does not cover the issue, say that clearly and suggest the agent escalate or check with a supervisor.
-    """.strip()
 
-    import re
+    Scenarios are streamed from the file and started as soon as they are
+    read; LLM calls run concurrently (at most `max_concurrency` in flight)
+    and results are printed in completion order.
 
-    for idx, text in enumerate(scenarios, start=1):
-        print("---")
-        print(f"Scenario {idx}:")
-        print(f"Customer (ASR)> {text}")
+    Every scenario calls the LLM so prompt/model changes show up; with
+    `use_cache` replies may come from (and are stored in) the semantic
+    response cache, except for lines prefixed with `/nocache`.
+    """
 
+    async def _run_one(
+        client: httpx.AsyncClient,
+        sem: asyncio.Semaphore,
+        idx: int,
+        text: str,
+        lookup: bool,
+    ) -> None:
         # Isolated session per scenario
         session = Session(session_id=str(uuid.uuid4()))
         session.add_turn(SpeakerRole.CUSTOMER, text)
 
-        history: list[dict] = []
-        for turn in session.turns:
-            if turn.speaker == SpeakerRole.CUSTOMER:
-                history.append({"role": "user", "content": turn.text})
-            else:
-                history.append({"role": "assistant", "content": turn.text})
+        history = session.as_llm_history()
 
-        # Add RAG context to the LLM input for scenario tests
-        rag_context = get_rag_context(text)
-        
-        if DEBUG_RAG:
-            print("=== RAG DEBUG ===")
-            print("QUESTION:", text)
-            print("CONTEXT PREVIEW:")
-            for line in rag_context.splitlines()[:8]:
-                print(line)
-            print("=================")
-        
-        augmented_message = f"""
-        Docs context:
+        # Add RAG context to the LLM input for scenario tests. Retrieval runs
+        # in a worker thread so all scenarios' lookups proceed in parallel.
+        rag_context = await asyncio.to_thread(get_rag_context, text)
 
-        {rag_context}
+        # Scenarios finish out of order: collect output and print it in one
+        # block so concurrent scenarios don't interleave.
+        out = ["---", f"Scenario {idx}:", f"Customer (ASR)> {text}"]
 
-        Instructions:
-        - Answer ONLY using the Docs context above.
-        - If the Docs context is missing information, say that explicitly
-          and suggest the agent escalate or check with a supervisor.
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("\n".join([f"Scenario {idx}:", *_rag_debug_lines(text, rag_context)]))
 
-        Customer question:
-        {text}
-        """.strip()
+        augmented_message = build_augmented_message(rag_context, text)
 
-        reply_text = generate_with_ollama(
-            system_prompt=system_prompt,
-            history=history,
-            user_message=augmented_message,
-        )
+        reply_text = None
+        if lookup:
+            reply_text = await asyncio.to_thread(semantic_cache.lookup, text, rag_context, history)
+        if reply_text is None:
+            async with sem:
+                reply_text = await generate_with_ollama_async(
+                    system_prompt=SYSTEM_PROMPT,
+                    history=history,
+                    user_message=augmented_message,
+                    client=client,
+                )
+            if use_cache:
+                await asyncio.to_thread(semantic_cache.store, text, rag_context, reply_text, history)
 
         # Post-process reply: strip surrounding quotes and keep first sentence
         reply_text = reply_text.strip()
-        reply_text = reply_text.strip('"').strip("'")
-        parts = re.split(r'(?<=[.!?])\s+', reply_text)
-        parts = [p.strip() for p in parts if p.strip()]
-        if parts:
-            reply_text = parts[0]
+        reply_text = reply_text.strip('"').strip("'").strip()
+        m = _FIRST_SENT.match(reply_text)
+        if m:
+            reply_text = m.group(1)
+
+        out.append(f"BOT> {reply_text}")
+        print("\n".join(out))
+
+    async def _run() -> None:
+        # Bound in-flight requests so Ollama isn't asked to hold every
+        # scenario in memory at once; it batches the concurrent decodes.
+        sem = asyncio.Semaphore(max_concurrency)
+        async with httpx.AsyncClient(timeout=120) as client:
+            tasks = []
+            for idx, line in enumerate(iter_scenarios(path), start=1):
+                text, line_use_cache = semantic_cache.split_nocache_flag(line)
+                lookup = use_cache and line_use_cache
+                tasks.append(asyncio.create_task(_run_one(client, sem, idx, text, lookup)))
+            if not tasks:
+                print("No scenarios to run.")
+                return
+            await asyncio.gather(*tasks)
 
-        print(f"BOT> {reply_text}")
+    asyncio.run(_run())
 
 
 
@@ -416,8 +481,20 @@ if __name__ == "__main__":
         action="store_true",
         help="Run LLM replies for scenarios from scenarios.txt (no TTS)",
     )
+    parser.add_argument(
+        "--use-cache",
+        action="store_true",
+        help="With --scenario-tests: reuse replies from the semantic response cache (off by default)",
+    )
     args = parser.parse_args()
 
+    level_name = os.environ.get("LOG_LEVEL", "INFO").upper()
+    level = logging.getLevelName(level_name)
+    if not isinstance(level, int):
+        print(f"Warning: unknown LOG_LEVEL {level_name!r}, using INFO")
+        level = logging.INFO
+    logging.basicConfig(level=level, format="%(message)s")
+
     if args.mic_test:
         # Import here so missing mic-test dependencies don't affect normal demo
         from src.audio.mic_test import record_test_clip
@@ -426,6 +503,6 @@ if __name__ == "__main__":
     elif args.full_voice_test:
         run_full_voice_test()
     elif getattr(args, "scenario_tests", False):
-        run_scenario_tests()
+        run_scenario_tests(use_cache=args.use_cache)
     else:
         demo_turn_based_audio_session()
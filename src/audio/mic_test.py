@@ -14,7 +14,6 @@ Run directly:
 from __future__ import annotations
 
 import os
-import wave
 from typing import Optional
 
 
@@ -28,22 +27,23 @@ def record_test_clip(duration: float = 3.0, sample_rate: int = 16000, filename:
 
     Behavior:
         - Prints status messages: "Recording...", "Done.", "Saved to mic_test.wav".
-        - Uses `sounddevice` to capture audio and the standard `wave` module
-          to write a 16-bit PCM WAV file.
+        - Uses `sounddevice` to capture int16 audio and `soundfile`
+          (libsndfile) to write a 16-bit PCM WAV file.
 
     Errors:
-        - If `sounddevice` or `numpy` are not installed, a clear message
+        - If `sounddevice`, `numpy` or `soundfile` are not installed, a clear message
           will be printed instructing how to install them.
         - If no input device is available or another runtime error occurs,
           the exception message will be printed.
     """
 
     try:
-        import sounddevice as sd
-        import numpy as np
+        import sounddevice  # checked here so a missing install gets the hint below
+        import soundfile as sf
+        from src.audio.pcm import record_pcm16
     except Exception as exc:  # ImportError or other
-        print("Error: recording requires the 'sounddevice' and 'numpy' packages.")
-        print("Install with: pip install sounddevice numpy")
+        print("Error: recording requires the 'sounddevice', 'numpy' and 'soundfile' packages.")
+        print("Install with: pip install sounddevice numpy soundfile")
         print(f"Detail: {exc}")
         return
 
@@ -51,24 +51,12 @@ def record_test_clip(duration: float = 3.0, sample_rate: int = 16000, filename:
 
     try:
         print("Recording...")
-        recording = sd.rec(int(duration * sample_rate), samplerate=sample_rate, channels=channels, dtype='float32')
-        sd.wait()
+        # Captured directly as int16 PCM, so no float conversion is needed
+        int_data = record_pcm16(duration, sample_rate, channels)
         print("Done.")
 
-        # Convert float32 array in range [-1.0, 1.0] to int16 PCM
-        audio = np.asarray(recording)
-        if audio.ndim > 1:
-            audio = audio.reshape(-1, channels)
-        # Clip to [-1,1]
-        audio = np.clip(audio, -1.0, 1.0)
-        int_data = (audio * 32767.0).astype(np.int16)
-
         # Write WAV
-        with wave.open(filename, 'wb') as wf:
-            wf.setnchannels(channels)
-            wf.setsampwidth(2)  # 16-bit
-            wf.setframerate(sample_rate)
-            wf.writeframes(int_data.tobytes())
+        sf.write(filename, int_data, sample_rate, subtype='PCM_16')
 
         print(f"Saved to {os.path.abspath(filename)}")
 
@@ -0,0 +1,54 @@
+"""PCM capture helpers.
+
+`record_pcm16` records from the default microphone straight into an int16
+buffer, so microphone capture needs no float32 recording or conversion
+pass.
+"""
+
+from __future__ import annotations
+
+import threading
+
+import numpy as np
+
+
+def record_pcm16(duration: float, sample_rate: int, channels: int = 1) -> np.ndarray:
+    """Record `duration` seconds from the default input device as int16 PCM.
+
+    PortAudio delivers int16 frames to a stream callback which copies them
+    into one preallocated `(frames, channels)` array; there is no float32
+    recording buffer and no conversion pass afterwards.
+
+    Returns:
+        The captured frames (may be slightly short if the device stalls).
+
+    Raises:
+        Whatever `sounddevice` raises (missing package, no input device, ...).
+    """
+    import sounddevice as sd
+
+    buf = np.empty((int(duration * sample_rate), channels), dtype=np.int16)
+    filled = 0
+    done = threading.Event()
+
+    def _callback(indata, frames, time_info, status) -> None:
+        nonlocal filled
+        n = min(frames, buf.shape[0] - filled)
+        buf[filled : filled + n] = indata[:n]
+        filled += n
+        if filled >= buf.shape[0]:
+            raise sd.CallbackStop
+
+    with sd.InputStream(
+        samplerate=sample_rate,
+        channels=channels,
+        dtype="int16",
+        callback=_callback,
+        finished_callback=done.set,
+    ):
+        done.wait(timeout=duration + 1.0)
+
+    return buf[:filled]
+
+
+__all__ = ["record_pcm16"]
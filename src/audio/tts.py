@@ -7,6 +7,7 @@ dependencies or audio playback logic — that will be added later.
 
 from __future__ import annotations
 
+from functools import lru_cache
 from typing import Any
 
 
@@ -63,6 +64,30 @@ def _debug_list_devices() -> None:
         print(f"ERROR querying audio devices: {e}")
 
 
+_SINE_TABLE_SIZE = 1024  # power of two so phase wraps with a bit mask
+
+
+@lru_cache(maxsize=1)
+def _sine_table():
+    """One period of a sine wave (float32), built on first use and reused."""
+    import numpy as np
+
+    return np.sin(np.linspace(0, 2 * np.pi, _SINE_TABLE_SIZE, endpoint=False, dtype=np.float32))
+
+
+def _tone_pcm16(frequency: float, sample_rate: int, n_samples: int, amplitude: float = 0.3) -> bytes:
+    """Return `n_samples` of a sine tone as 16-bit little-endian PCM bytes.
+
+    Samples are looked up in the shared sine table (phase index masked to the
+    table size) instead of evaluating sin() per sample.
+    """
+    import numpy as np
+
+    step = _SINE_TABLE_SIZE * frequency / sample_rate
+    idx = (np.arange(n_samples) * step).astype(np.int64) & (_SINE_TABLE_SIZE - 1)
+    return (32767 * amplitude * _sine_table()[idx]).astype("<i2").tobytes()
+
+
 def _debug_play_test_tone() -> None:
     """Play a short test tone (440 Hz sine wave, 2 seconds).
 
@@ -73,12 +98,11 @@ def _debug_play_test_tone() -> None:
         from src.audio.tts import _debug_play_test_tone
         _debug_play_test_tone()
 
-    Requires pydub and a supported audio library (pydub.playback backend).
+    Requires pydub, numpy and a supported audio library (pydub.playback backend).
     """
     try:
         from pydub import AudioSegment
         from pydub.playback import play
-        import math
 
         print("\nDEBUG: Generating test tone (440 Hz sine, 2 seconds)...")
         # Generate 440 Hz sine wave for 2 seconds at 44.1 kHz
@@ -86,17 +110,11 @@ def _debug_play_test_tone() -> None:
         duration_seconds = 2
         frequency = 440
 
-        # Simple sine wave generation using pydub
-        # (pydub.generators requires numpy, so we'll use AudioSegment.silent + overlay trick)
-        # Actually, let's try a simpler approach with raw audio:
-        samples = []
-        for i in range(sample_rate * duration_seconds):
-            sample = int(32767 * 0.3 * math.sin(2 * math.pi * frequency * i / sample_rate))
-            samples.append(sample.to_bytes(2, byteorder="little", signed=True))
+        samples = _tone_pcm16(frequency, sample_rate, sample_rate * duration_seconds)
 
         # Create AudioSegment from raw samples
         tone = AudioSegment(
-            data=b"".join(samples),
+            data=samples,
             sample_width=2,
             frame_rate=sample_rate,
             channels=1,
@@ -107,7 +125,7 @@ def _debug_play_test_tone() -> None:
         print("DEBUG: Test tone finished.")
 
     except ImportError as e:
-        print(f"ERROR: Missing dependency. Install with: pip install pydub")
+        print(f"ERROR: Missing dependency. Install with: pip install pydub numpy")
         print(f"       Detail: {e}")
     except Exception as e:
         print(f"ERROR playing test tone: {e}")
@@ -1,27 +1,37 @@
 ("""Voice activity detection (VAD) wrapper module.
 
-This module provides a minimal, importable skeleton for a Silero-based
-VAD integration. It intentionally contains no real VAD logic — those details
-will be implemented later. For now the shapes and docstrings are defined so
-the rest of the codebase can import and use the types without runtime errors.
+This module provides a Silero VAD integration running the ONNX model
+through onnxruntime on CPU. The model and runtime are loaded lazily on the
+first processed window, so importing this module needs neither.
+
+Get the v5 model (`silero_vad.onnx`) from the snakers4/silero-vad
+repository and pass its path as `model_path`.
 """)
 
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import List, Optional
+from typing import Any, List, Optional
+
+import numpy as np
+
+# Seconds of most recent audio kept in the ring buffer
+_BUFFER_SECONDS = 10
+
+# Silero v5 scores fixed windows and prepends the tail of the previous one
+_WINDOW_SAMPLES = {16000: 512, 8000: 256}
+_CONTEXT_SAMPLES = {16000: 64, 8000: 32}
 
 
-@dataclass
+@dataclass(slots=True)
 class SpeechSegment:
 	"""Represents one contiguous detected speech segment.
 
 	Attributes:
 		start_time: Start time in seconds (relative to the session or stream).
 		end_time: End time in seconds.
-		samples: Raw audio bytes for this segment. This may be PCM or WAV
-			encoded bytes depending on downstream expectations; the exact
-			format will be decided when wiring the real VAD.
+		samples: Raw 16-bit mono PCM bytes for this segment (same format
+			as the chunks passed to `SileroVAD.process_chunk`).
 	"""
 
 	start_time: float
@@ -30,63 +40,215 @@ class SpeechSegment:
 
 
 class SileroVAD:
-	"""Skeleton Silero VAD wrapper.
+	"""Silero VAD wrapper (ONNX model via onnxruntime).
 
-	This class is a placeholder that defines the public API we expect to
-	implement. The real implementation will call into a Silero VAD model
-	(or another VAD engine), maintain frame-level state, and yield
-	completed `SpeechSegment` objects when speech is detected and then
-	ends. For now methods contain simple placeholders so they are usable
-	in tests and imports.
+	Audio is pushed with `process_chunk`; each complete window (32 ms) is
+	scored as soon as it is available and completed `SpeechSegment`
+	objects are returned once speech has started and then ended. Call
+	`flush` at the end of a stream to close a segment that is still open.
 
 	Args:
-		sample_rate: Sample rate in Hz for incoming audio (default 16000).
-		threshold: Float threshold controlling sensitivity (model-specific;
-			placeholder here).
+		sample_rate: Sample rate in Hz for incoming audio (8000 or 16000).
+		threshold: Speech probability at or above which a window counts
+			as speech. Speech ends after `min_silence_ms` of windows
+			below `threshold - 0.15`.
+		model_path: Path to the Silero VAD v5 ONNX model.
+		min_silence_ms: Silence required to close a segment.
+		num_threads: onnxruntime intra-op threads.
 	"""
 
-	def __init__(self, sample_rate: int = 16000, threshold: float = 0.5):
+	def __init__(
+		self,
+		sample_rate: int = 16000,
+		threshold: float = 0.5,
+		model_path: str = "silero_vad.onnx",
+		min_silence_ms: int = 100,
+		num_threads: int = 2,
+	):
 		self.sample_rate = int(sample_rate)
+		if self.sample_rate not in _WINDOW_SAMPLES:
+			raise ValueError("sample_rate must be 8000 or 16000 for Silero VAD")
 		self.threshold = float(threshold)
+		self.model_path = model_path
+		self.num_threads = int(num_threads)
+		self._window = _WINDOW_SAMPLES[self.sample_rate]
+		self._context_size = _CONTEXT_SAMPLES[self.sample_rate]
+		self._min_silence_windows = max(1, int(min_silence_ms * self.sample_rate / 1000) // self._window)
+		self._sess: Any = None
 		# internal buffers/state (implementation detail)
 		self.reset()
 
+	def _ensure_session(self) -> Any:
+		if self._sess is None:
+			try:
+				import onnxruntime as ort
+			except ImportError as exc:
+				raise RuntimeError("onnxruntime is required for VAD. Install: pip install onnxruntime") from exc
+
+			opts = ort.SessionOptions()
+			opts.intra_op_num_threads = self.num_threads
+			opts.inter_op_num_threads = 1
+			self._sess = ort.InferenceSession(
+				self.model_path, sess_options=opts, providers=["CPUExecutionProvider"]
+			)
+		return self._sess
+
 	def reset(self) -> None:
 		"""Reset internal state.
 
 		Call this when starting a new session or when you need to discard
-		buffered audio/state accumulated so far.
+		buffered audio/state accumulated so far. The loaded model is kept.
 		"""
-		# Placeholder internal state used by a future implementation.
-		self._buffer: bytearray = bytearray()
+		# Preallocated int16 ring buffer holding the last `_BUFFER_SECONDS`
+		# of audio; `_write` is the next write position and `_pending` the
+		# number of buffered samples not yet scored.
+		self._buffer: np.ndarray = np.zeros(self.sample_rate * _BUFFER_SECONDS, dtype=np.int16)
+		self._write: int = 0
+		self._pending: int = 0
+		# Trailing odd byte of the last chunk (half a sample)
+		self._carry: bytes = b""
+		# Recurrent model state and the previous window's tail
+		self._state: np.ndarray = np.zeros((2, 1, 128), dtype=np.float32)
+		self._context: np.ndarray = np.zeros((1, self._context_size), dtype=np.float32)
+		self._base_time: Optional[float] = None
+		self._scored: int = 0
 		self._current_start: Optional[float] = None
 		self._in_speech: bool = False
+		self._speech: List[np.ndarray] = []
+		self._silence_windows: int = 0
 
 	def process_chunk(self, audio_chunk: bytes, chunk_start_time: float) -> List[SpeechSegment]:
 		"""Process an incoming audio chunk and return completed segments.
 
 		Parameters:
-			audio_chunk: A bytes object containing the next chunk of audio.
-				The precise encoding (raw PCM, WAV, etc.) will be decided
-				when the real VAD is integrated.
+			audio_chunk: A bytes object containing the next chunk of audio
+				as raw 16-bit little-endian mono PCM at `sample_rate`. A
+				chunk may end mid-sample; the odd byte is carried over to
+				the next chunk.
 			chunk_start_time: The start timestamp (in seconds) of this chunk
-				relative to the start of the session/stream.
+				relative to the start of the session/stream. Chunks are
+				assumed contiguous; only the first one after `reset` sets
+				the time base.
 
 		Returns:
 			A list of zero or more `SpeechSegment` instances representing
 			speech that was detected and completed as a result of processing
 			this chunk. If speech is ongoing but not yet finished, the
-			segment should not be returned until its end is observed.
-
-		Note: Current implementation is a stub and always returns an empty
-		list. Replace the body with real Silero VAD processing later.
+			segment is not returned until its end is observed.
 		"""
-		# Append audio to internal buffer (placeholder behavior)
-		self._buffer.extend(audio_chunk)
-
-		# No actual detection yet — return empty list to indicate no
-		# completed segments were produced from this chunk.
-		return []
+		if self._base_time is None:
+			self._base_time = float(chunk_start_time)
+
+		# A chunk may split a sample: prepend the byte carried from the last
+		# chunk and hold back a trailing odd byte for the next one
+		if self._carry:
+			audio_chunk = self._carry + audio_chunk
+			self._carry = b""
+		if len(audio_chunk) % 2:
+			self._carry = audio_chunk[-1:]
+
+		# View the whole samples as int16 (no copy) and write them into the
+		# ring buffer
+		samples = np.frombuffer(audio_chunk, dtype=np.int16, count=len(audio_chunk) // 2)
+		self._append(samples)
+		self._pending += samples.size
+		if self._pending > self._buffer.size:
+			# Fell more than the buffer behind: skip audio that was overwritten
+			self._scored += self._pending - self._buffer.size
+			self._pending = self._buffer.size
+
+		segments: List[SpeechSegment] = []
+		size = self._buffer.size
+		while self._pending >= self._window:
+			start = (self._write - self._pending) % size
+			if start + self._window <= size:
+				window = self._buffer[start:start + self._window]
+			else:
+				# Only a window straddling the end of the ring needs a copy
+				window = np.concatenate((self._buffer[start:], self._buffer[:start + self._window - size]))
+			self._pending -= self._window
+			segment = self._update(window, self._speech_prob(window))
+			self._scored += self._window
+			if segment is not None:
+				segments.append(segment)
+		return segments
+
+	def flush(self) -> List[SpeechSegment]:
+		"""Close and return a segment still open at the end of the stream.
+
+		Buffered audio shorter than one window is not scored.
+		"""
+		if not self._in_speech:
+			return []
+		return [self._close_segment(self._time_at(self._scored))]
+
+	def _time_at(self, sample_index: int) -> float:
+		return (self._base_time or 0.0) + sample_index / self.sample_rate
+
+	def _speech_prob(self, window: np.ndarray) -> float:
+		# Windows run one at a time: each step feeds the recurrent state of
+		# the previous one, so consecutive windows of a stream can't be
+		# batched into one forward pass.
+		x = np.concatenate([self._context, window.reshape(1, -1).astype(np.float32) / 32768.0], axis=1)
+		out, self._state = self._ensure_session().run(
+			None,
+			{"input": x, "state": self._state, "sr": np.array(self.sample_rate, dtype=np.int64)},
+		)
+		self._context = x[:, -self._context_size:]
+		return float(out[0, 0])
+
+	def _update(self, window: np.ndarray, prob: float) -> Optional[SpeechSegment]:
+		if prob >= self.threshold:
+			if not self._in_speech:
+				self._in_speech = True
+				self._current_start = self._time_at(self._scored)
+				self._speech = []
+			self._silence_windows = 0
+			# `window` may be a view into the ring buffer; keep a copy
+			self._speech.append(window.copy())
+			return None
+
+		if not self._in_speech:
+			return None
+
+		self._speech.append(window.copy())
+		if prob < self.threshold - 0.15:
+			self._silence_windows += 1
+			if self._silence_windows >= self._min_silence_windows:
+				return self._close_segment(self._time_at(self._scored + self._window))
+		else:
+			self._silence_windows = 0
+		return None
+
+	def _close_segment(self, end_time: float) -> SpeechSegment:
+		segment = SpeechSegment(
+			start_time=self._current_start if self._current_start is not None else end_time,
+			end_time=end_time,
+			samples=np.concatenate(self._speech).tobytes() if self._speech else b"",
+		)
+		self._in_speech = False
+		self._current_start = None
+		self._speech = []
+		self._silence_windows = 0
+		return segment
+
+	def _append(self, samples: np.ndarray) -> None:
+		"""Copy `samples` into the ring buffer, overwriting the oldest audio."""
+		size = self._buffer.size
+		n = samples.size
+		if n >= size:
+			self._buffer[:] = samples[-size:]
+			self._write = 0
+			return
+
+		end = self._write + n
+		if end <= size:
+			self._buffer[self._write:end] = samples
+		else:
+			first = size - self._write
+			self._buffer[self._write:] = samples[:first]
+			self._buffer[:n - first] = samples[first:]
+		self._write = end % size
 
 
 __all__ = ["SpeechSegment", "SileroVAD"]
@@ -1,25 +1,34 @@
 """Simple Ollama chat wrapper used by the support assistant.
 
 Provides:
-- generate_bot_reply(model, system_prompt, history, user_message) -> str
+- generate_bot_reply(model, system_prompt, history, user_message, on_token=None) -> str
 
 Behavior:
-- Builds a messages list from optional system prompt, history and the new user
-  message.
-- Calls `ollama.chat(model=model, messages=messages)` and extracts the
-  assistant content. On error, returns a friendly fallback string.
+- Builds a messages list from optional system prompt, the last
+  `MAX_HISTORY_TURNS` history items and the new user message.
+- Calls `ollama.chat(model=model, messages=messages, stream=True)`, passes each
+  token to the optional `on_token` callback as it arrives, and returns the
+  joined assistant content. On error, returns a friendly fallback string.
 
 Note: this module intentionally keeps the wrapper small and testable — no
-streaming or advanced error-retry logic here.
+advanced error-retry logic here.
 """
 from __future__ import annotations
 
-from typing import Any
+from typing import Any, Callable, Optional
 
 import ollama
 
+from src.dialogue.ollama_client import recent_history
 
-def generate_bot_reply(model: str, system_prompt: str, history: list[dict], user_message: str) -> str:
+
+def generate_bot_reply(
+    model: str,
+    system_prompt: str,
+    history: list[dict],
+    user_message: str,
+    on_token: Optional[Callable[[str], None]] = None,
+) -> str:
     """Generate a single assistant reply via the local Ollama API.
 
     Args:
@@ -27,10 +36,12 @@ def generate_bot_reply(model: str, system_prompt: str, history: list[dict], user
         system_prompt: Optional system-level prompt (empty string to omit).
         history: List of {"role": "user"|"assistant", "content": str}.
         user_message: The new user message to append.
+        on_token: Optional callback called with each piece of the reply as it
+            streams in (e.g. to print it immediately).
 
     Returns:
         Assistant reply as plain string. On failure returns a short fallback
-        message.
+        message (also passed to `on_token`).
     """
     # Build messages for Ollama
     messages: list[dict[str, str]] = []
@@ -38,8 +49,8 @@ def generate_bot_reply(model: str, system_prompt: str, history: list[dict], user
     if system_prompt:
         messages.append({"role": "system", "content": system_prompt})
 
-    # Append history (assume caller passes valid role/content dicts)
-    for item in history or []:
+    # Append recent history (assume caller passes valid role/content dicts)
+    for item in recent_history(history or []):
         role = item.get("role")
         content = item.get("content")
         if not role or not content:
@@ -51,13 +62,23 @@ def generate_bot_reply(model: str, system_prompt: str, history: list[dict], user
     messages.append({"role": "user", "content": user_message})
 
     try:
-        response: Any = ollama.chat(model=model, messages=messages)
-        # Return only the assistant text from the expected response shape.
-        return response["message"]["content"]
+        parts: list[str] = []
+        chunk: Any
+        for chunk in ollama.chat(model=model, messages=messages, stream=True):
+            # Keep only the assistant text from the expected chunk shape.
+            token = chunk["message"]["content"]
+            if token:
+                parts.append(token)
+                if on_token is not None:
+                    on_token(token)
+        return "".join(parts)
 
     except Exception as e:
         # Include exception message in the fallback for easier debugging.
-        return f"Sorry, I had an issue generating a response: {e}"
+        fallback = f"Sorry, I had an issue generating a response: {e}"
+        if on_token is not None:
+            on_token(fallback)
+        return fallback
 
 
 __all__ = ["generate_bot_reply"]
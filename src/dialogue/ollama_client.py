@@ -1,14 +1,32 @@
+import json
+import threading
+from itertools import islice
+from typing import Iterable, Iterator, Optional, Sequence
+
+import httpx
 import requests
 
 OLLAMA_URL = "http://localhost:11434/api/chat"
+OLLAMA_EMBED_URL = "http://localhost:11434/api/embed"
 MODEL_NAME = "llama3.2"
+EMBED_MODEL_NAME = "nomic-embed-text"
 
+# Only the most recent history messages are sent, so prompt length (and
+# per-turn latency) stays bounded as a session grows
+MAX_HISTORY_TURNS = 12
 
-def generate_with_ollama(system_prompt: str, history: list[dict], user_message: str) -> str:
-    """Call the local Ollama /api/chat endpoint and return assistant text.
+# One requests.Session per thread (Session isn't documented as thread-safe
+# and the semantic cache embeds from worker threads), so sync calls still
+# reuse a keep-alive connection to Ollama
+_LOCAL = threading.local()
 
-    Non-streaming, simple JSON request/response.
-    """
+
+def recent_history(history: Sequence[dict]) -> Iterable[dict]:
+    """Return the last `MAX_HISTORY_TURNS` items of `history` (list or deque)."""
+    return islice(history, max(0, len(history) - MAX_HISTORY_TURNS), None)
+
+
+def _build_messages(system_prompt: str, history: list[dict], user_message: str) -> list[dict]:
     messages: list[dict] = []
 
     if system_prompt:
@@ -16,11 +34,34 @@ def generate_with_ollama(system_prompt: str, history: list[dict], user_message:
 
     # Expect history items already shaped as {"role": ..., "content": ...}
     if history:
-        messages.extend(history)
+        messages.extend(recent_history(history))
 
     messages.append({"role": "user", "content": user_message})
+    return messages
+
+
+def _session() -> requests.Session:
+    session = getattr(_LOCAL, "session", None)
+    if session is None:
+        session = _LOCAL.session = requests.Session()
+    return session
+
 
-    resp = requests.post(
+def _raise_on_error(data: dict) -> None:
+    # A failure after streaming has started arrives as an {"error": ...} line
+    # with a 200 status, so raise_for_status() can't catch it
+    if "error" in data:
+        raise RuntimeError(f"Ollama error: {data['error']}")
+
+
+def generate_with_ollama(system_prompt: str, history: list[dict], user_message: str) -> str:
+    """Call the local Ollama /api/chat endpoint and return assistant text.
+
+    Non-streaming, simple JSON request/response.
+    """
+    messages = _build_messages(system_prompt, history, user_message)
+
+    resp = _session().post(
         OLLAMA_URL,
         json={
             "model": MODEL_NAME,
@@ -31,7 +72,99 @@ def generate_with_ollama(system_prompt: str, history: list[dict], user_message:
     )
     resp.raise_for_status()
     data = resp.json()
+    _raise_on_error(data)
     return data["message"]["content"]
 
 
-__all__ = ["generate_with_ollama"]
+def stream_with_ollama(system_prompt: str, history: list[dict], user_message: str) -> Iterator[str]:
+    """Call the local Ollama /api/chat endpoint and yield reply tokens as they arrive.
+
+    Joining the yielded strings gives the same text `generate_with_ollama`
+    returns; callers can act on the first tokens without waiting for the rest.
+    """
+    with _session().post(
+        OLLAMA_URL,
+        json={
+            "model": MODEL_NAME,
+            "messages": _build_messages(system_prompt, history, user_message),
+            "stream": True,
+        },
+        stream=True,
+        timeout=120,
+    ) as resp:
+        resp.raise_for_status()
+        # Ollama streams one JSON object per line
+        for line in resp.iter_lines():
+            if not line:
+                continue
+            data = json.loads(line)
+            _raise_on_error(data)
+            token = data.get("message", {}).get("content", "")
+            if token:
+                yield token
+            if data.get("done"):
+                break
+
+
+async def generate_with_ollama_async(
+    system_prompt: str,
+    history: list[dict],
+    user_message: str,
+    client: Optional[httpx.AsyncClient] = None,
+) -> str:
+    """Async variant of `generate_with_ollama` for running many chats at once.
+
+    Streams the /api/chat response and returns the joined assistant text.
+    Pass a shared `client` to reuse its connection pool across calls.
+    """
+    payload = {
+        "model": MODEL_NAME,
+        "messages": _build_messages(system_prompt, history, user_message),
+        "stream": True,
+    }
+
+    if client is None:
+        async with httpx.AsyncClient(timeout=120) as own_client:
+            return await _collect_chat_stream(own_client, payload)
+    return await _collect_chat_stream(client, payload)
+
+
+async def _collect_chat_stream(client: httpx.AsyncClient, payload: dict) -> str:
+    parts: list[str] = []
+    async with client.stream("POST", OLLAMA_URL, json=payload) as resp:
+        resp.raise_for_status()
+        # Ollama streams one JSON object per line
+        async for line in resp.aiter_lines():
+            if not line:
+                continue
+            data = json.loads(line)
+            _raise_on_error(data)
+            parts.append(data.get("message", {}).get("content", ""))
+            if data.get("done"):
+                break
+    return "".join(parts)
+
+
+def embed_with_ollama(text: str) -> list[float]:
+    """Call the local Ollama /api/embed endpoint and return one embedding vector."""
+    resp = _session().post(
+        OLLAMA_EMBED_URL,
+        json={
+            "model": EMBED_MODEL_NAME,
+            "input": text,
+        },
+        timeout=30,
+    )
+    resp.raise_for_status()
+    data = resp.json()
+    return data["embeddings"][0]
+
+
+__all__ = [
+    "MAX_HISTORY_TURNS",
+    "recent_history",
+    "generate_with_ollama",
+    "stream_with_ollama",
+    "generate_with_ollama_async",
+    "embed_with_ollama",
+]
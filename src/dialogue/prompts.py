@@ -0,0 +1,40 @@
+"""Prompt text shared by the voice loop and the evaluation scripts.
+
+Provides:
+- SYSTEM_PROMPT: the telecom support-coach system prompt.
+- build_augmented_message(ctx, q) -> str: the user message sent to the LLM,
+  combining retrieved FAQ context, grounding instructions and the question.
+"""
+
+from __future__ import annotations
+
+from typing import Final
+
+SYSTEM_PROMPT: Final[str] = """
+You are a telecom customer support coach.
+You talk to a human agent (not the customer) and tell them what to say.
+Always follow the Docs context from support_faq.md over any other knowledge.
+When answering, give 3–6 concise bullet points the agent can read out.
+If the Docs context does not cover the issue, say that clearly and suggest the agent escalate or check with a supervisor.
+""".strip()
+
+_AUGMENTED_MESSAGE_TEMPLATE = """\
+Docs context:
+
+{ctx}
+
+Instructions:
+- Answer ONLY using the Docs context above.
+- If the Docs context is missing information, say that explicitly
+  and suggest the agent escalate or check with a supervisor.
+
+Customer question:
+{q}"""
+
+
+def build_augmented_message(ctx: str, q: str) -> str:
+    """Return the RAG-augmented user message for context `ctx` and question `q`."""
+    return _AUGMENTED_MESSAGE_TEMPLATE.format(ctx=ctx, q=q).strip()
+
+
+__all__ = ["SYSTEM_PROMPT", "build_augmented_message"]
@@ -0,0 +1,207 @@
+"""Semantic response cache for Ollama replies.
+
+Replies are stored in a small SQLite database together with an embedding
+of the customer question and a hash of everything else the reply depends
+on: the RAG context and the instructions template wrapped around it,
+`SYSTEM_PROMPT`, the chat model and the prior chat history sent to the
+LLM. `lookup` embeds a new question, compares it against cached questions
+in the same namespace with the same hash, and returns the closest reply if
+its cosine similarity clears `SIMILARITY_THRESHOLD`. Editing the prompt or
+its template, switching model or asking mid-conversation therefore never
+serves a reply produced under different inputs.
+
+Notes:
+- Embeddings come from Ollama (`nomic-embed-text`) and are stored
+  L2-normalized, so cosine similarity is a plain dot product.
+- Entries older than `TTL_SECONDS` are ignored and purged on write.
+- The cache never breaks a turn: if embedding or the database fails, the
+  cache disables itself for the rest of the process and every lookup is a
+  miss.
+- Prefix a customer message with `/nocache` to skip the lookup (the fresh
+  reply is still stored, refreshing the entry).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.dialogue import ollama_client, prompts
+from src.dialogue.ollama_client import embed_with_ollama
+
+CACHE_PATH = "cache/semantic_cache.sqlite3"
+NAMESPACE = "telecom_faq"
+SIMILARITY_THRESHOLD = 0.92
+TTL_SECONDS = 24 * 60 * 60
+NOCACHE_PREFIX = "/nocache"
+
+_CONN: Optional[sqlite3.Connection] = None
+_LOCK = threading.Lock()
+_DISABLED = False
+
+
+def split_nocache_flag(text: str) -> Tuple[str, bool]:
+    """Strip a leading `/nocache` flag (followed by whitespace or nothing) from `text`.
+
+    Returns:
+        `(text, use_cache)` where `text` has the prefix removed and
+        `use_cache` is False if the prefix was present.
+    """
+    rest = text[len(NOCACHE_PREFIX):]
+    # The flag must be a whole word: "/nocachefoo" is not the flag
+    if text.startswith(NOCACHE_PREFIX) and (not rest or rest[0].isspace()):
+        return rest.strip(), False
+    return text, True
+
+
+def _context_hash(question: str, context: str, history: Sequence[dict]) -> str:
+    """Hash the inputs besides the question that shape the reply.
+
+    Covers the chat and embedding models, the system prompt, the augmented
+    message built around the RAG context (so edits to its instructions
+    template count too) and the history window actually sent to the LLM,
+    minus the trailing current question if the caller's history already
+    includes it.
+    """
+    prior = list(ollama_client.recent_history(history))
+    if prior and prior[-1].get("role") == "user" and prior[-1].get("content") == question:
+        prior.pop()
+
+    h = hashlib.sha256()
+    for part in (
+        ollama_client.MODEL_NAME,
+        ollama_client.EMBED_MODEL_NAME,
+        prompts.SYSTEM_PROMPT,
+        # Context wrapped in the instructions template, question left empty
+        prompts.build_augmented_message(context, ""),
+    ):
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    h.update(json.dumps(prior, sort_keys=True).encode("utf-8"))
+    return h.hexdigest()
+
+
+@lru_cache(maxsize=256)
+def _embed(question: str) -> np.ndarray:
+    """Embed and L2-normalize a question (memoized so lookup+store embed once)."""
+    vec = np.asarray(embed_with_ollama(question), dtype=np.float32)
+    norm = np.linalg.norm(vec)
+    if norm > 0:
+        vec /= norm
+    return vec
+
+
+def _ensure_conn() -> sqlite3.Connection:
+    global _CONN
+    if _CONN is None:
+        os.makedirs(os.path.dirname(os.path.abspath(CACHE_PATH)), exist_ok=True)
+        conn = sqlite3.connect(CACHE_PATH, check_same_thread=False)
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS replies (
+                id INTEGER PRIMARY KEY,
+                namespace TEXT NOT NULL,
+                question TEXT NOT NULL,
+                context_hash TEXT NOT NULL,
+                embedding BLOB NOT NULL,
+                reply TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+            """
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_replies_lookup "
+            "ON replies (namespace, context_hash, created_at)"
+        )
+        conn.commit()
+        _CONN = conn
+    return _CONN
+
+
+def _disable(exc: Exception) -> None:
+    global _DISABLED
+    _DISABLED = True
+    print(f"Semantic cache disabled: {exc}")
+
+
+def lookup(
+    question: str,
+    context: str,
+    history: Sequence[dict] = (),
+    namespace: str = NAMESPACE,
+) -> Optional[str]:
+    """Return a cached reply for a semantically similar question, or None.
+
+    Only entries in `namespace` produced from the same `context`, system
+    prompt, model and prior `history` (chat messages sent to the LLM) and
+    younger than `TTL_SECONDS` are considered.
+    """
+    if _DISABLED:
+        return None
+
+    try:
+        q_vec = _embed(question)
+        with _LOCK:
+            rows = _ensure_conn().execute(
+                "SELECT embedding, reply FROM replies "
+                "WHERE namespace = ? AND context_hash = ? AND created_at >= ? "
+                "ORDER BY created_at DESC",
+                (namespace, _context_hash(question, context, history), time.time() - TTL_SECONDS),
+            ).fetchall()
+        # Rows embedded with another model (different dimension) can't be
+        # compared; the key hash already excludes them, this guards old rows
+        rows = [r for r in rows if len(r[0]) == q_vec.nbytes]
+        if not rows:
+            return None
+
+        matrix = np.frombuffer(b"".join(r[0] for r in rows), dtype=np.float32).reshape(len(rows), -1)
+        scores = matrix @ q_vec
+        best = int(np.argmax(scores))
+    except Exception as exc:
+        _disable(exc)
+        return None
+
+    if scores[best] >= SIMILARITY_THRESHOLD:
+        return rows[best][1]
+    return None
+
+
+def store(
+    question: str,
+    context: str,
+    reply: str,
+    history: Sequence[dict] = (),
+    namespace: str = NAMESPACE,
+) -> None:
+    """Cache `reply` for `question` answered from `context` after `history`.
+
+    Empty replies (e.g. from a failed generation) are never stored.
+    """
+    if _DISABLED or not reply.strip():
+        return
+
+    try:
+        q_vec = _embed(question)
+        now = time.time()
+        with _LOCK:
+            conn = _ensure_conn()
+            conn.execute("DELETE FROM replies WHERE created_at < ?", (now - TTL_SECONDS,))
+            conn.execute(
+                "INSERT INTO replies (namespace, question, context_hash, embedding, reply, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (namespace, question, _context_hash(question, context, history), q_vec.tobytes(), reply, now),
+            )
+            conn.commit()
+    except Exception as exc:
+        _disable(exc)
+
+
+__all__ = ["lookup", "store", "split_nocache_flag"]
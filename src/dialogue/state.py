@@ -2,17 +2,26 @@
 
 Provides:
 - SpeakerRole enum (CUSTOMER, BOT, HUMAN_AGENT)
-- Turn dataclass (speaker, text, timestamp, meta)
-- Session dataclass with methods to append turns and manage escalation
+- Turn dataclass (speaker, text, meta, timestamp)
+- Session dataclass with methods to append turns, expose LLM chat history
+  and manage escalation
 
 Designed for Python 3.11+ and easy extension.
 """
 from __future__ import annotations
 
+import time
+from collections import deque
 from dataclasses import dataclass, field
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 from enum import Enum
-from typing import Any, Dict, List, Optional
+from itertools import islice
+from typing import Any, Deque, Dict, Optional
+
+# Turns kept per session; older turns are dropped as new ones arrive
+MAX_TURNS = 200
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
 
 
 class SpeakerRole(Enum):
@@ -26,39 +35,63 @@ class SpeakerRole(Enum):
         return self.value
 
 
-@dataclass
+@dataclass(slots=True)
 class Turn:
     """One turn in the conversation.
 
     Attributes:
         speaker: Which role produced this turn.
         text: The spoken / written content.
-        timestamp: Time the turn was created (UTC, tz-aware).
         meta: Arbitrary metadata (intent, confidence, source, etc.).
+        timestamp: Time the turn was created (UTC, tz-aware; read-only,
+            built on access from the stored `time.time_ns()` value).
     """
 
     speaker: SpeakerRole
     text: str
-    timestamp: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
     meta: Dict[str, Any] = field(default_factory=dict)
+    # Creation time as integer ns since the epoch; cheaper than a datetime
+    _ts_ns: int = field(default_factory=time.time_ns, init=False, repr=False)
+    # "<iso-timestamp> <SPEAKER>: <text>", rendered on first use
+    _rendered: Optional[str] = field(default=None, init=False, repr=False, compare=False)
+
+    @property
+    def timestamp(self) -> datetime:
+        return _EPOCH + timedelta(microseconds=self._ts_ns // 1000)
 
     def __str__(self) -> str:
-        return f"{self.timestamp.isoformat()} {self.speaker.name}: {self.text}"
+        if self._rendered is None:
+            self._rendered = f"{self.timestamp.isoformat()} {self.speaker.name}: {self.text}"
+        return self._rendered
+
+
+def _llm_message(turn: Turn) -> Dict[str, str]:
+    # The customer is the LLM "user"; bot and human agent both answer as "assistant"
+    role = "user" if turn.speaker == SpeakerRole.CUSTOMER else "assistant"
+    return {"role": role, "content": turn.text}
 
 
-@dataclass
+@dataclass(slots=True)
 class Session:
     """Conversation session holding turns and state.
 
-    Minimal, extendable model for managing handoffs and summaries.
+    Minimal, extendable model for managing handoffs and summaries. Only the
+    most recent `MAX_TURNS` turns are kept.
     """
 
     session_id: str
-    turns: List[Turn] = field(default_factory=list)
+    turns: Deque[Turn] = field(default_factory=lambda: deque(maxlen=MAX_TURNS))
     active_role: SpeakerRole = SpeakerRole.BOT
     issue_summary: Optional[str] = None
     escalated: bool = False
     resolved: bool = False
+    # LLM chat history mirroring `turns`, extended by one entry per add_turn
+    _llm_history: Deque[Dict[str, str]] = field(default_factory=deque, init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        if not isinstance(self.turns, deque) or self.turns.maxlen != MAX_TURNS:
+            self.turns = deque(self.turns, maxlen=MAX_TURNS)
+        self._llm_history = deque((_llm_message(t) for t in self.turns), maxlen=MAX_TURNS)
 
     def add_turn(self, speaker: SpeakerRole, text: str, meta: Optional[Dict[str, Any]] = None) -> Turn:
         """Append a new Turn and return it.
@@ -75,6 +108,7 @@ class Session:
 
         turn = Turn(speaker=speaker, text=text, meta=meta or {})
         self.turns.append(turn)
+        self._llm_history.append(_llm_message(turn))
 
         # sensible auto-advance of active_role (doesn't change `escalated`)
         if self.escalated:
@@ -89,13 +123,22 @@ class Session:
 
         return turn
 
+    def as_llm_history(self) -> Deque[Dict[str, str]]:
+        """Return the turns as LLM chat messages ({"role", "content"} dicts).
+
+        Customer turns map to "user", bot and human agent turns to
+        "assistant". The deque is maintained incrementally by `add_turn`
+        (bounded like `turns`), so this is O(1); treat it as read-only.
+        """
+        return self._llm_history
+
     def get_recent_context(self, n: int = 10) -> str:
         """Return the last `n` turns as a single string (oldest->newest).
 
         Each turn is rendered as: "<iso-timestamp> <SPEAKER>: <text>" on its own line.
         """
-        recent = self.turns[-max(0, n) :]
-        return "\n".join(t.__str__() for t in recent)
+        recent = islice(self.turns, max(0, len(self.turns) - max(0, n)), None)
+        return "\n".join(str(t) for t in recent)
 
     def update_issue_summary(self, summary: str) -> None:
         """Store a short, user-provided issue summary."""
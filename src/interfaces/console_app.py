@@ -8,6 +8,8 @@ Run with: `python -m src.interfaces.console_app` or `python src/interfaces/conso
 """
 from __future__ import annotations
 
+import re
+import sys
 import uuid
 from typing import Optional
 
@@ -19,8 +21,25 @@ from src.rag.simple_faq_rag import get_rag_context
 PROMPT_CUSTOMER = "Customer> "
 PROMPT_HUMAN = "HUMAN_AGENT> "
 
+# Messages made only of these words carry no new topic, so the previous
+# turn's RAG context is reused instead of running retrieval again
+_FILLER_WORDS = frozenset({
+    "ok", "okay", "k", "thanks", "thank", "you", "thx", "yes", "yeah", "yep",
+    "no", "nope", "bye", "goodbye", "sure", "cool", "great", "alright", "right",
+    "hmm", "hi", "hello",
+})
+_WORD = re.compile(r"[a-z']+")
 
 
+def _is_filler(text: str) -> bool:
+    words = _WORD.findall(text.lower())
+    return bool(words) and all(w in _FILLER_WORDS for w in words)
+
+
+def _write_token(token: str) -> None:
+    sys.stdout.write(token)
+    sys.stdout.flush()
+
 
 def _print_instructions() -> None:
     print("--- Support Assistant Console Demo ---")
@@ -50,6 +69,8 @@ def main(session_id: Optional[str] = None) -> None:
         "Answer briefly and clearly."
     )
 
+    last_rag_context = ""
+
     try:
         while True:
             try:
@@ -82,16 +103,16 @@ def main(session_id: Optional[str] = None) -> None:
             session.add_turn(SpeakerRole.CUSTOMER, customer_text)
 
             if session.active_role == SpeakerRole.BOT:
-                # Build history for the LLM
-                history: list[dict] = []
-                for turn in session.turns:
-                    if turn.speaker == SpeakerRole.CUSTOMER:
-                        history.append({"role": "user", "content": turn.text})
-                    else:
-                        history.append({"role": "assistant", "content": turn.text})
-
-                # Retrieve short RAG context and augment the user message
-                rag_context = get_rag_context(customer_text)
+                # History for the LLM, kept up to date by Session.add_turn
+                history = session.as_llm_history()
+
+                # Retrieve short RAG context (reused for filler like "ok thanks")
+                # and augment the user message
+                if _is_filler(customer_text):
+                    rag_context = last_rag_context
+                else:
+                    rag_context = get_rag_context(customer_text)
+                    last_rag_context = rag_context
                 augmented_user_message = f"""
                 Docs context:
 
@@ -101,13 +122,16 @@ def main(session_id: Optional[str] = None) -> None:
                 {customer_text}
                 """.strip()
 
+                # Print the reply as it streams in instead of after it completes
+                print("BOT> ", end="", flush=True)
                 reply_text = generate_bot_reply(
                     model="phi3",
                     system_prompt=system_prompt,
                     history=history,
                     user_message=augmented_user_message,
+                    on_token=_write_token,
                 )
-                print(f"BOT> {reply_text}")
+                print()
                 session.add_turn(SpeakerRole.BOT, reply_text)
 
             elif session.active_role == SpeakerRole.HUMAN_AGENT:
@@ -1,22 +1,50 @@
 """Tiny in-memory RAG helper for the support FAQ.
 
 This module provides simple functions to load a Markdown FAQ, chunk it,
-build an in-memory embedding index (list of (text, vector)), and retrieve
-the top-k relevant chunks for a query using cosine similarity.
+build an in-memory embedding index (chunk texts plus one L2-normalized
+embedding matrix), and retrieve the top-k relevant chunks for a query
+using cosine similarity.
 
 Notes:
-- Uses sentence-transformers `all-MiniLM-L6-v2` for embeddings.
+- Uses `all-MiniLM-L6-v2` for embeddings: the PyTorch model via
+  sentence-transformers by default, or its ONNX build via `fastembed`
+  (FP32, no quantization; avoids loading torch) when `EMBED_BACKEND=fastembed`
+  is set. The backend never changes just because a package is installed.
 - Keeps everything in-memory and lazy-loads the model and index on first use.
+- Chunk embeddings are cached under `cache/` keyed by a hash of the chunks
+  and model name, so warm starts skip the encode pass.
 """
 
 from __future__ import annotations
 
-from typing import List, Tuple, Optional
+from functools import lru_cache
+from typing import Iterator, List, Tuple, Optional
+import hashlib
+import json
 import os
+import re
+import threading
 
-VECTOR_DB: List[Tuple[str, List[float]]] = []
+import numpy as np
+
+EMBED_MODEL_NAME = "all-MiniLM-L6-v2"
+# "sentence-transformers" (default) or "fastembed" (ONNX, opt-in)
+EMBED_BACKEND = os.environ.get("EMBED_BACKEND", "sentence-transformers").strip().lower()
+INDEX_CACHE_DIR = "cache"
+
+# Leading "#"s and spaces of a Markdown heading line
+_HEADING_PREFIX = re.compile(r"^[#\s]+")
+
+# (chunk texts, (N, D) float32 matrix of L2-normalized embeddings)
+VECTOR_DB: Optional[Tuple[List[str], np.ndarray]] = None
 _MODEL = None
 _LOADED_FAQ_TEXT: Optional[str] = None
+_INDEX_LOCK = threading.Lock()
+_MODEL_LOCK = threading.Lock()
+
+# Encoding runs in worker threads; keep HF tokenizers from starting their own
+# thread pool (and warning about it after a fork)
+os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
 
 
 def load_faq_markdown(path: str = "data/support_faq.md") -> str:
@@ -26,13 +54,8 @@ def load_faq_markdown(path: str = "data/support_faq.md") -> str:
         return f.read()
 
 
-def chunk_faq(text: str) -> List[str]:
-    """Split the FAQ into chunks by headings and blank lines.
-
-    Each chunk contains a heading and its bullet points so it's a short
-    paragraph suitable to include in prompts.
-    """
-    chunks: List[str] = []
+def _iter_chunks(text: str) -> Iterator[str]:
+    """Yield FAQ chunks in one pass, skipping tiny ones as they are produced."""
     current: List[str] = []
 
     for line in text.splitlines():
@@ -40,107 +63,262 @@ def chunk_faq(text: str) -> List[str]:
         if not s:
             # blank line: end of current chunk
             if current:
-                chunks.append("\n".join(current).strip())
+                chunk = "\n".join(current).strip()
+                if len(chunk) > 10:
+                    yield chunk
                 current = []
             continue
 
         # Treat heading lines (start with #) as start of new chunk
-        if s.startswith("#"):
+        if s[0] == "#":
             if current:
-                chunks.append("\n".join(current).strip())
-            current = [s.lstrip("# ").strip()]
+                chunk = "\n".join(current).strip()
+                if len(chunk) > 10:
+                    yield chunk
+            current = [_HEADING_PREFIX.sub("", s)]
         else:
             current.append(s)
 
     if current:
-        chunks.append("\n".join(current).strip())
+        chunk = "\n".join(current).strip()
+        if len(chunk) > 10:
+            yield chunk
 
-    # Filter out any tiny chunks
-    return [c for c in chunks if len(c) > 10]
 
+def chunk_faq(text: str) -> List[str]:
+    """Split the FAQ into chunks by headings and blank lines.
 
-def _ensure_model():
-    global _MODEL
-    if _MODEL is None:
+    Each chunk contains a heading and its bullet points so it's a short
+    paragraph suitable to include in prompts. Tiny chunks (10 characters or
+    fewer) are dropped.
+    """
+    return list(_iter_chunks(text))
+
+
+class _FastEmbedModel:
+    """Adapter giving a fastembed `TextEmbedding` the `.encode` call used here."""
+
+    def __init__(self, model_name: str):
+        from fastembed import TextEmbedding
+
+        self._model = TextEmbedding(model_name=model_name)
+
+    def encode(
+        self,
+        sentences: List[str],
+        batch_size: int = 64,
+        convert_to_numpy: bool = True,
+        normalize_embeddings: bool = False,
+        show_progress_bar: bool = False,
+    ) -> np.ndarray:
+        matrix = np.asarray(list(self._model.embed(list(sentences), batch_size=batch_size)), dtype=np.float32)
+        if normalize_embeddings:
+            matrix /= np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+        return matrix
+
+
+def _embed_backend() -> str:
+    """Return which embedding backend `_ensure_model` will use (without loading it)."""
+    if EMBED_BACKEND not in ("sentence-transformers", "fastembed"):
+        raise RuntimeError(
+            f"Unknown EMBED_BACKEND {EMBED_BACKEND!r}; use 'sentence-transformers' or 'fastembed'"
+        )
+    return EMBED_BACKEND
+
+
+def _load_model():
+    if _embed_backend() == "fastembed":
         try:
-            from sentence_transformers import SentenceTransformer
-        except Exception as exc:
+            return _FastEmbedModel(f"sentence-transformers/{EMBED_MODEL_NAME}")
+        except ImportError as exc:
             raise RuntimeError(
-                "sentence-transformers is required for embeddings. Install: pip install sentence-transformers"
+                "EMBED_BACKEND=fastembed requires fastembed. Install: pip install fastembed"
             ) from exc
 
-        _MODEL = SentenceTransformer("all-MiniLM-L6-v2")
+    try:
+        from sentence_transformers import SentenceTransformer
+    except Exception as exc:
+        raise RuntimeError(
+            "sentence-transformers is required for embeddings. Install: pip install sentence-transformers"
+        ) from exc
+
+    import torch
+
+    # Give the encoder half the cores; the rest stay free for the audio/LLM threads
+    torch.set_num_threads(max(1, (os.cpu_count() or 2) // 2))
+    return SentenceTransformer(EMBED_MODEL_NAME)
+
+
+def _ensure_model():
+    """Load the embedding model once; safe to call from worker threads."""
+    global _MODEL
+    if _MODEL is None:
+        with _MODEL_LOCK:
+            if _MODEL is None:
+                _MODEL = _load_model()
     return _MODEL
 
 
+def _index_cache_paths() -> Tuple[str, str, str]:
+    return (
+        os.path.join(INDEX_CACHE_DIR, "faq_emb.npy"),
+        os.path.join(INDEX_CACHE_DIR, "faq_texts.json"),
+        os.path.join(INDEX_CACHE_DIR, "faq_emb.sha256"),
+    )
+
+
+def _index_key(chunks: List[str]) -> str:
+    h = hashlib.sha256(f"{_embed_backend()}:{EMBED_MODEL_NAME}".encode("utf-8"))
+    for chunk in chunks:
+        h.update(b"\0")
+        h.update(chunk.encode("utf-8"))
+    return h.hexdigest()
+
+
+def _load_index_cache(key: str) -> Optional[Tuple[List[str], np.ndarray]]:
+    """Return the cached (texts, matrix) if it was built for `key`, else None."""
+    emb_path, texts_path, key_path = _index_cache_paths()
+    try:
+        with open(key_path, "r", encoding="utf-8") as f:
+            if f.read().strip() != key:
+                return None
+        with open(texts_path, "r", encoding="utf-8") as f:
+            texts = json.load(f)
+        matrix = np.load(emb_path)
+    except (OSError, ValueError):
+        return None
+    if matrix.ndim != 2 or matrix.shape[0] != len(texts):
+        return None
+    return texts, matrix.astype(np.float32, copy=False)
+
+
+def _save_index_cache(key: str, texts: List[str], matrix: np.ndarray) -> None:
+    emb_path, texts_path, key_path = _index_cache_paths()
+    try:
+        os.makedirs(INDEX_CACHE_DIR, exist_ok=True)
+        np.save(emb_path, matrix)
+        with open(texts_path, "w", encoding="utf-8") as f:
+            json.dump(texts, f)
+        # Written last so an interrupted save is seen as a cache miss
+        with open(key_path, "w", encoding="utf-8") as f:
+            f.write(key)
+    except OSError as exc:
+        print(f"Could not write FAQ index cache: {exc}")
+
+
 def build_faq_index(chunks: List[str]) -> None:
-    """Embed each chunk and store (text, vector) tuples in module-level VECTOR_DB."""
+    """Embed each chunk and store (texts, matrix) in module-level VECTOR_DB.
+
+    Rows of the matrix are L2-normalized, so a dot product with a normalized
+    query is its cosine similarity. Embeddings are loaded from the on-disk
+    cache when the chunks and model are unchanged; otherwise they are
+    computed and the cache is refreshed.
+    """
     global VECTOR_DB
+    key = _index_key(chunks)
+    cached = _load_index_cache(key)
+    if cached is not None:
+        VECTOR_DB = cached
+        _retrieve_cached.cache_clear()
+        return
+
     model = _ensure_model()
-    # Compute embeddings in one batch
-    embeddings = model.encode(chunks, convert_to_numpy=True)
-    VECTOR_DB = []
-    for text, vec in zip(chunks, embeddings):
-        VECTOR_DB.append((text, vec.tolist()))
+    # Compute embeddings in batches
+    matrix = model.encode(
+        chunks, batch_size=64, convert_to_numpy=True, normalize_embeddings=True, show_progress_bar=False
+    ).astype(np.float32)
+    _save_index_cache(key, list(chunks), matrix)
+    # Build fully before publishing so concurrent readers never see a partial index
+    VECTOR_DB = (list(chunks), matrix)
+    _retrieve_cached.cache_clear()
 
 
-def _cosine_sim(a, b) -> float:
-    import math
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the `k` highest scores along the last axis, best first.
 
-    # both a and b are lists or numpy arrays
-    try:
-        import numpy as np
-
-        a = np.array(a, dtype=float)
-        b = np.array(b, dtype=float)
-        if a.size == 0 or b.size == 0:
-            return 0.0
-        denom = (np.linalg.norm(a) * np.linalg.norm(b))
-        if denom == 0:
-            return 0.0
-        return float((a @ b) / denom)
-    except Exception:
-        # fallback
-        dot = sum(x * y for x, y in zip(a, b))
-        norma = math.sqrt(sum(x * x for x in a))
-        normb = math.sqrt(sum(y * y for y in b))
-        if norma == 0 or normb == 0:
-            return 0.0
-        return dot / (norma * normb)
+    `argpartition` selects the top k in linear time; only those k are then
+    sorted.
+    """
+    n = scores.shape[-1]
+    if k <= 0:
+        return np.empty(scores.shape[:-1] + (0,), dtype=np.intp)
+    if k >= n:
+        return np.argsort(-scores, axis=-1, kind="stable")
+    idx = np.argpartition(scores, n - k, axis=-1)[..., n - k :]
+    order = np.argsort(-np.take_along_axis(scores, idx, axis=-1), axis=-1, kind="stable")
+    return np.take_along_axis(idx, order, axis=-1)
 
 
 def retrieve_faq_chunks(query: str, k: int = 3) -> List[str]:
     """Return the top-k chunk texts most similar to the query."""
-    if not VECTOR_DB:
+    if VECTOR_DB is None or not VECTOR_DB[0]:
         return []
 
+    texts, matrix = VECTOR_DB
     model = _ensure_model()
-    q_vec = model.encode([query], convert_to_numpy=True)[0]
+    q_vec = model.encode([query], convert_to_numpy=True, normalize_embeddings=True)[0].astype(np.float32)
 
-    # Score each chunk
-    scored: List[Tuple[float, str]] = []
-    for text, vec in VECTOR_DB:
-        score = _cosine_sim(q_vec, vec)
-        scored.append((score, text))
+    # Cosine similarity against every chunk in one matrix-vector product
+    scores = matrix @ q_vec
 
-    scored.sort(key=lambda x: x[0], reverse=True)
-    top = [t for _, t in scored[:k]]
-    return top
+    return [texts[i] for i in _top_k(scores, k)]
+
+
+def _ensure_index() -> None:
+    """Load the FAQ and build the index once; safe to call from worker threads."""
+    global _LOADED_FAQ_TEXT
+
+    if VECTOR_DB is None:
+        with _INDEX_LOCK:
+            if VECTOR_DB is None:
+                # load FAQ and build index
+                if _LOADED_FAQ_TEXT is None:
+                    _LOADED_FAQ_TEXT = load_faq_markdown()
+                chunks = chunk_faq(_LOADED_FAQ_TEXT)
+                build_faq_index(chunks)
+
+
+@lru_cache(maxsize=128)
+def _retrieve_cached(query_norm: str, k: int) -> Tuple[str, ...]:
+    # Memoized on the normalized query so repeated phrasings skip the encode
+    # and scoring; cleared whenever build_faq_index publishes a new index.
+    return tuple(retrieve_faq_chunks(query_norm, k=k))
 
 
 def get_rag_context(question: str, k: int = 3) -> str:
     """High-level helper that lazy-loads the FAQ, builds the index once,
     retrieves the top-k chunks, and returns them joined as a string.
-    """
-    global _LOADED_FAQ_TEXT
 
-    if not VECTOR_DB:
-        # load FAQ and build index
-        if _LOADED_FAQ_TEXT is None:
-            _LOADED_FAQ_TEXT = load_faq_markdown()
-        chunks = chunk_faq(_LOADED_FAQ_TEXT)
-        build_faq_index(chunks)
+    Retrieval is memoized per (normalized question, k), where case and
+    surrounding whitespace are ignored; safe to call from worker threads.
+    """
+    _ensure_index()
 
-    top_chunks = retrieve_faq_chunks(question, k=k)
+    top_chunks = _retrieve_cached(question.strip().lower(), k)
     # Join with two newlines to keep chunks distinct in prompts
     return "\n\n".join(top_chunks)
+
+
+def get_rag_context_batch(questions: List[str], k: int = 3) -> List[str]:
+    """Batch version of `get_rag_context` for a list of questions known up front.
+
+    All questions are embedded in one `encode` call and scored against the
+    index with a single matrix product. Returns one context string per
+    question, in order.
+    """
+    _ensure_index()
+    if not questions or VECTOR_DB is None or not VECTOR_DB[0]:
+        return ["" for _ in questions]
+
+    texts, matrix = VECTOR_DB
+    model = _ensure_model()
+    q_mat = model.encode(
+        list(questions), batch_size=64, convert_to_numpy=True, normalize_embeddings=True, show_progress_bar=False
+    ).astype(np.float32)
+
+    # Cosine similarity for every (question, chunk) pair at once
+    scores = q_mat @ matrix.T
+
+    # Same selection as retrieve_faq_chunks, row by row
+    top = _top_k(scores, k)
+    return ["\n\n".join(texts[i] for i in row) for row in top]
@@ -0,0 +1,110 @@
+"""SileroVAD segmentation tests with a fake onnxruntime session.
+
+The fake scores a window as speech when its mean absolute amplitude is
+above 0.1, so no model file or onnxruntime install is needed.
+
+Run with `python -m pytest tests/test_vad.py` (or `python -m tests.test_vad`).
+"""
+
+import numpy as np
+
+from src.audio.vad import SileroVAD
+
+RATE = 16000
+WINDOW = 512
+CONTEXT = 64
+SPEECH = 10000  # int16 amplitude, ~0.3 after scaling
+
+
+class _FakeSession:
+    def run(self, _outputs, feeds):
+        x = feeds["input"]
+        assert x.shape == (1, CONTEXT + WINDOW)
+        prob = float(np.abs(x[:, CONTEXT:]).mean() > 0.1)
+        return np.array([[prob]], dtype=np.float32), feeds["state"]
+
+
+def _vad(**kwargs) -> SileroVAD:
+    vad = SileroVAD(sample_rate=RATE, min_silence_ms=100, **kwargs)
+    vad._sess = _FakeSession()
+    return vad
+
+
+def _audio(*parts) -> bytes:
+    """Build PCM from (windows, amplitude) pairs."""
+    return np.concatenate(
+        [np.full(windows * WINDOW, amp, dtype=np.int16) for windows, amp in parts]
+    ).tobytes()
+
+
+def _feed(vad: SileroVAD, pcm: bytes, chunk_bytes: int, start_time: float = 0.0):
+    segments = []
+    for offset in range(0, len(pcm), chunk_bytes):
+        segments += vad.process_chunk(pcm[offset:offset + chunk_bytes], start_time)
+    return segments
+
+
+def test_segment_start_and_end_times():
+    pcm = _audio((32, 0), (16, SPEECH), (8, 0))
+    segments = _feed(_vad(), pcm, chunk_bytes=640, start_time=5.0)
+
+    assert len(segments) == 1
+    seg = segments[0]
+    # Speech starts at window 32; 100 ms of silence is 3 windows, so the
+    # segment closes at the end of window 50
+    assert abs(seg.start_time - (5.0 + 32 * WINDOW / RATE)) < 1e-9
+    assert abs(seg.end_time - (5.0 + 51 * WINDOW / RATE)) < 1e-9
+    assert len(seg.samples) == 19 * WINDOW * 2
+    assert seg.samples[: 16 * WINDOW * 2] == _audio((16, SPEECH))
+
+
+def test_flush_closes_open_segment():
+    vad = _vad()
+    assert _feed(vad, _audio((8, 0), (4, SPEECH)), chunk_bytes=1024) == []
+
+    segments = vad.flush()
+    assert len(segments) == 1
+    assert abs(segments[0].start_time - 8 * WINDOW / RATE) < 1e-9
+    assert abs(segments[0].end_time - 12 * WINDOW / RATE) < 1e-9
+    assert segments[0].samples == _audio((4, SPEECH))
+    assert vad.flush() == []
+
+
+def test_flush_without_speech_returns_nothing():
+    vad = _vad()
+    _feed(vad, _audio((8, 0)), chunk_bytes=1024)
+    assert vad.flush() == []
+
+
+def test_odd_byte_chunks_match_even_chunks():
+    pcm = _audio((10, 0), (12, SPEECH), (6, 0), (5, SPEECH))
+    even, odd = _vad(), _vad()
+
+    expected = _feed(even, pcm, chunk_bytes=1024) + even.flush()
+    got = _feed(odd, pcm, chunk_bytes=333) + odd.flush()
+
+    assert len(expected) == 2
+    assert got == expected
+
+
+def test_chunk_longer_than_buffer_keeps_stream_time():
+    # 10.24 s of silence, 1.024 s of speech and 0.256 s of silence in one
+    # chunk: more than the 10 s ring buffer, so the oldest audio is skipped
+    pcm = _audio((320, 0), (32, SPEECH), (8, 0))
+    vad = _vad()
+    segments = vad.process_chunk(pcm, 0.0)
+
+    assert len(segments) == 1
+    seg = segments[0]
+    speech_start = 320 * WINDOW / RATE
+    speech_end = 352 * WINDOW / RATE
+    assert abs(seg.start_time - speech_start) <= WINDOW / RATE
+    assert speech_end < seg.end_time <= speech_end + 4 * WINDOW / RATE
+    assert vad.flush() == []
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print("ok", name)